@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""Generate deterministic synthetic recording sessions for load tests.
+
+Output follows the recorded ndjson schema (meta, gps, imu-delta, final) either
+as one replay-style file per boat or split into chunks the way core/recording.js
+uploads them and racetimer-upload stores them. Records are streamed straight to
+gzip, so multi-hour fleets never have to fit in memory.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parents[1] / "synthetic-sessions"
+# 2026-01-28 20:02:45 UTC, same as the bundled replay fixture.
+DEFAULT_START_MS = 1769630565227
+DEFAULT_LAT = 56.1572
+DEFAULT_LON = 10.1584
+EARTH_RADIUS_M = 6371000.0
+KNOTS_TO_MS = 0.514444
+# Mirrors KALMAN_PREDICT_HZ in app.js; imu-delta is logged on every prediction.
+IMU_HZ = 5
+GPS_EVERY_STEPS = IMU_HZ
+# Mirrors DEFAULT_CHUNK_BYTES and FLUSH_INTERVAL_MS in core/recording.js.
+DEFAULT_CHUNK_BYTES = 512 * 1024
+FLUSH_INTERVAL_MS = 20000
+ID_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+TWA_UP_DEG = 45.0
+TWA_DOWN_DEG = 150.0
+MAX_TURN_RATE_DEG_S = 12.0
+
+
+def random_id(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(ID_ALPHABET) for _ in range(length))
+
+
+def iso_from_ms(ts: int) -> str:
+    # Matches Date.prototype.toISOString().
+    stamp = datetime.fromtimestamp(ts / 1000.0, tz=timezone.utc)
+    return stamp.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts % 1000:03d}Z"
+
+
+def dumps(record: Dict[str, object]) -> str:
+    return json.dumps(record, separators=(",", ":"))
+
+
+def parse_oscillation(raw: str) -> Tuple[float, float]:
+    """Parse PERIOD_MIN:AMPLITUDE_DEG."""
+    period_min, amplitude_deg = raw.split(":")
+    return float(period_min) * 60.0, float(amplitude_deg)
+
+
+def parse_shift(raw: str) -> Tuple[float, float, float]:
+    """Parse AT_MIN:DELTA_DEG[:RAMP_MIN]."""
+    parts = raw.split(":")
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"invalid shift {raw!r}")
+    ramp_sec = float(parts[2]) * 60.0 if len(parts) == 3 else 0.0
+    return float(parts[0]) * 60.0, float(parts[1]), ramp_sec
+
+
+class WindModel:
+    """Fleet-wide wind direction: base + oscillations + scripted shifts + gust noise."""
+
+    def __init__(
+        self,
+        rng: random.Random,
+        base_deg: float,
+        oscillations: List[Tuple[float, float]],
+        shifts: List[Tuple[float, float, float]],
+        noise_deg: float,
+    ) -> None:
+        self.base_deg = base_deg
+        self.oscillations = [
+            (period_sec, amplitude_deg, rng.uniform(0.0, 2.0 * math.pi))
+            for period_sec, amplitude_deg in oscillations
+        ]
+        self.shifts = sorted(shifts)
+        self.noise_deg = noise_deg
+
+    def direction(self, t_sec: float, rng: random.Random) -> float:
+        value = self.base_deg
+        for period_sec, amplitude_deg, phase in self.oscillations:
+            value += amplitude_deg * math.sin(2.0 * math.pi * t_sec / period_sec + phase)
+        for at_sec, delta_deg, ramp_sec in self.shifts:
+            if t_sec <= at_sec:
+                break
+            if ramp_sec > 0.0:
+                value += delta_deg * min(1.0, (t_sec - at_sec) / ramp_sec)
+            else:
+                value += delta_deg
+        if self.noise_deg > 0.0:
+            value += rng.gauss(0.0, self.noise_deg)
+        return value % 360.0
+
+
+def build_meta_payload(
+    rng: random.Random,
+    session_id: str,
+    device_id: str,
+    started_at: int,
+    boat_length_m: float,
+) -> Dict[str, object]:
+    # Same shape as getSettingsSnapshot()/getDeviceInfoSnapshot() in app.js.
+    return {
+        "sessionId": session_id,
+        "deviceId": device_id,
+        "startedAt": started_at,
+        "note": "synthetic",
+        "settings": {
+            "line": {"a": {"lat": None, "lon": None}, "b": {"lat": None, "lon": None}},
+            "lineMeta": {"name": None, "sourceId": None},
+            "course": {"enabled": False, "marks": [], "finish": None},
+            "coordsFormat": "dd",
+            "headingSourceByMode": {"lifter": "kalman"},
+            "soundEnabled": True,
+            "timeFormat": "24h",
+            "speedUnit": "kn",
+            "distanceUnit": "m",
+            "bowOffsetMeters": 5,
+            "boatLengthMeters": boat_length_m,
+            "boatModel": "",
+            "boatShape": "",
+            "boatWeightKg": 0,
+            "imuCalibration": {
+                "axes": ["beta", "alpha", "gamma"],
+                "signs": [-1, -1, -1],
+                "calibratedAt": started_at - rng.randint(10_000, 600_000),
+            },
+            "replayLoop": False,
+            "start": {
+                "mode": "countdown",
+                "countdownSeconds": 300,
+                "absoluteTime": "",
+                "startTs": None,
+                "crossedEarly": False,
+                "freeze": None,
+            },
+            "vmg": {
+                "baselineTauSeconds": 45,
+                "mode": "beat",
+                "tack": "starboard",
+                "twaUpDeg": TWA_UP_DEG,
+                "twaDownDeg": TWA_DOWN_DEG,
+                "imuEnabled": True,
+                "smoothCurrent": True,
+                "capEnabled": True,
+            },
+            "lifter": {"windowSeconds": 300, "imuEnabled": True},
+        },
+        "device": {
+            "userAgent": "synthetic-session-generator",
+            "platform": "synthetic",
+            "language": "en-US",
+            "hardwareConcurrency": 4,
+            "deviceMemory": None,
+            "screen": {
+                "width": 390,
+                "height": 844,
+                "availWidth": 390,
+                "availHeight": 844,
+                "pixelRatio": 3,
+            },
+        },
+        "app": {"build": "synthetic"},
+    }
+
+
+def simulate_boat(
+    rng: random.Random,
+    wind: WindModel,
+    wind_rng: random.Random,
+    start_ms: int,
+    duration_sec: float,
+    lat0: float,
+    lon0: float,
+    leg_sec: float,
+    speed_kn: float,
+) -> Iterator[Tuple[int, str, Dict[str, object]]]:
+    """Yield (ts, type, payload) for gps and imu-delta records in time order."""
+    step_sec = 1.0 / IMU_HZ
+    steps = int(duration_sec * IMU_HZ)
+    north_m = rng.uniform(-200.0, 200.0)
+    east_m = rng.uniform(-200.0, 200.0)
+    tack_sign = rng.choice((-1.0, 1.0))
+    next_tack_sec = rng.uniform(120.0, 480.0)
+    upwind = True
+    next_leg_sec = leg_sec
+    wind_dir = wind.direction(0.0, wind_rng)
+    heading = (wind_dir + tack_sign * TWA_UP_DEG) % 360.0
+    lat_scale = math.cos(math.radians(lat0))
+    # Per-boat bias so a fleet is not perfectly identical.
+    boat_speed_factor = rng.uniform(0.9, 1.1)
+    for step in range(1, steps + 1):
+        t_sec = step * step_sec
+        ts = start_ms + int(round(t_sec * 1000.0))
+        if t_sec >= next_leg_sec:
+            upwind = not upwind
+            next_leg_sec += leg_sec
+        if t_sec >= next_tack_sec:
+            tack_sign = -tack_sign
+            next_tack_sec += rng.uniform(120.0, 480.0) if upwind else rng.uniform(240.0, 720.0)
+        if step % GPS_EVERY_STEPS == 0:
+            wind_dir = wind.direction(t_sec, wind_rng)
+        twa = TWA_UP_DEG if upwind else TWA_DOWN_DEG
+        target = (wind_dir + tack_sign * twa) % 360.0
+        error = (target - heading + 540.0) % 360.0 - 180.0
+        max_turn = MAX_TURN_RATE_DEG_S * step_sec
+        turn = max(-max_turn, min(max_turn, error)) + rng.gauss(0.0, 0.3)
+        heading = (heading + turn) % 360.0
+        yield ts, "imu-delta", {"deltaHeadingRad": math.radians(turn) + rng.gauss(0.0, 0.002)}
+
+        # Boats slow down through a tack and accelerate out of it.
+        turning = min(1.0, abs(error) / 90.0)
+        speed_ms = speed_kn * KNOTS_TO_MS * boat_speed_factor * (1.0 - 0.5 * turning)
+        speed_ms = max(0.0, speed_ms + rng.gauss(0.0, 0.05))
+        north_m += speed_ms * step_sec * math.cos(math.radians(heading))
+        east_m += speed_ms * step_sec * math.sin(math.radians(heading))
+
+        if step % GPS_EVERY_STEPS != 0:
+            continue
+        accuracy = max(1.5, rng.gauss(5.0, 1.5))
+        noise_n = rng.gauss(0.0, accuracy / 2.0)
+        noise_e = rng.gauss(0.0, accuracy / 2.0)
+        lat = lat0 + math.degrees((north_m + noise_n) / EARTH_RADIUS_M)
+        lon = lon0 + math.degrees((east_m + noise_e) / (EARTH_RADIUS_M * lat_scale))
+        coords = {
+            "lat": lat,
+            "lon": lon,
+            "accuracy": accuracy,
+            "speed": max(0.0, speed_ms + rng.gauss(0.0, 0.1)),
+            "heading": (heading + rng.gauss(0.0, 2.0)) % 360.0,
+            "altitude": 40.0 + rng.gauss(0.0, 2.0),
+            "altitudeAccuracy": 30,
+            "speedAccuracy": None,
+            "headingAccuracy": None,
+        }
+        # Arrives after this prediction tick but before the next one, so ts stays ordered.
+        device_ts = ts + rng.randint(1, 40)
+        payload = dict(coords)
+        payload.update(
+            {
+                "coords": coords,
+                "gpsTimeMs": ts - rng.randint(0, 80),
+                "deviceTimeMs": device_ts,
+            }
+        )
+        yield device_ts, "gps", payload
+
+
+def open_gzip(path: Path):
+    # Empty filename and mtime=0 keep the gzip header, and thus the bytes, reproducible.
+    raw = path.open("wb")
+    return raw, gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+
+
+class SessionFileWriter:
+    """One replay-style rt-DEVICE-sess-ID.ndjson.gz file."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._raw, self._gz = open_gzip(path)
+        self.bytes = 0
+
+    def write(self, record: Dict[str, object], kind: str) -> None:
+        line = (dumps(record) + "\n").encode("utf-8")
+        self._gz.write(line)
+        self.bytes += len(line)
+
+    def close(self) -> None:
+        self._gz.close()
+        self._raw.close()
+
+
+class ChunkedSessionWriter:
+    """chunks/NNNNNN-ID-KIND.ndjson.gz plus manifest.json, as racetimer-upload stores them.
+
+    Meta and final records get chunks of their own. Data records are cut at
+    chunk_bytes or when the flush timer started by the first pending record
+    fires, following the flush rules in core/recording.js.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        device_id: str,
+        session_id: str,
+        chunk_bytes: int,
+        rng: random.Random,
+    ) -> None:
+        self.session_dir = root / device_id / session_id
+        (self.session_dir / "chunks").mkdir(parents=True, exist_ok=True)
+        self.device_id = device_id
+        self.session_id = session_id
+        self.chunk_bytes = chunk_bytes
+        self.rng = rng
+        self.bytes = 0
+        self.manifest: Dict[str, object] = {
+            "deviceId": device_id,
+            "sessionId": session_id,
+            "createdAt": None,
+            "chunks": [],
+        }
+        self._lines: List[bytes] = []
+        self._pending = 0
+        self._first_ts: Optional[int] = None
+        self._last_ts: Optional[int] = None
+
+    def write(self, record: Dict[str, object], kind: str) -> None:
+        line = (dumps(record) + "\n").encode("utf-8")
+        self.bytes += len(line)
+        ts = int(record["ts"])
+        if kind != "data":
+            self._flush(ts)
+            self._emit(kind, [line], ts, ts, ts)
+            return
+        if self._first_ts is not None and ts >= self._first_ts + FLUSH_INTERVAL_MS:
+            # scheduleFlush() fires FLUSH_INTERVAL_MS after the first pending record.
+            self._flush(self._first_ts + FLUSH_INTERVAL_MS)
+        elif self._lines and self._pending + len(line) > self.chunk_bytes:
+            self._flush(ts)
+        self._lines.append(line)
+        self._pending += len(line)
+        if self._first_ts is None:
+            self._first_ts = ts
+        self._last_ts = ts
+
+    def _flush(self, now_ts: int) -> None:
+        if not self._lines:
+            return
+        self._emit("data", self._lines, self._first_ts, self._last_ts, now_ts)
+        self._lines = []
+        self._pending = 0
+        self._first_ts = None
+        self._last_ts = None
+
+    def _emit(self, kind: str, lines: List[bytes], first_ts: int, last_ts: int, now_ts: int) -> None:
+        index = len(self.manifest["chunks"])
+        if kind == "meta":
+            chunk_id = f"meta-{self.session_id}"
+        elif kind == "final":
+            chunk_id = f"final-{self.session_id}-{random_id(self.rng, 4)}"
+        else:
+            chunk_id = f"chunk-{now_ts}-{random_id(self.rng, 4)}"
+        key = f"{self.device_id}/{self.session_id}/chunks/{index:06d}-{chunk_id}-{kind}.ndjson.gz"
+        raw, gz = open_gzip(self.session_dir / "chunks" / Path(key).name)
+        size = 0
+        for line in lines:
+            gz.write(line)
+            size += len(line)
+        gz.close()
+        raw.close()
+        received_at = iso_from_ms(now_ts)
+        if self.manifest["createdAt"] is None:
+            self.manifest["createdAt"] = received_at
+        self.manifest["chunks"].append(
+            {
+                "id": chunk_id,
+                "index": index,
+                "kind": kind,
+                "bytes": size,
+                "firstTs": first_ts,
+                "lastTs": last_ts,
+                "key": key,
+                "receivedAt": received_at,
+            }
+        )
+        self.manifest["updatedAt"] = received_at
+        if kind == "final":
+            self.manifest["completedAt"] = received_at
+
+    def close(self) -> None:
+        if self._last_ts is not None:
+            self._flush(self._last_ts)
+        with (self.session_dir / "manifest.json").open("w") as handle:
+            json.dump(self.manifest, handle, indent=2)
+            handle.write("\n")
+
+
+def generate_session(
+    args: argparse.Namespace,
+    boat_index: int,
+    wind: WindModel,
+) -> Tuple[str, int]:
+    # Seed per boat so any one boat can be regenerated without the rest of the fleet.
+    rng = random.Random(f"{args.seed}:boat:{boat_index}")
+    wind_rng = random.Random(f"{args.seed}:wind:{boat_index}")
+    start_ms = args.start_ms + rng.randint(0, 30_000)
+    device_id = f"rt-{random_id(rng, 12)}"
+    session_id = f"sess-{start_ms - rng.randint(1, 20)}-{random_id(rng, 6)}"
+    if args.chunked:
+        writer = ChunkedSessionWriter(args.output, device_id, session_id, args.chunk_bytes, rng)
+    else:
+        writer = SessionFileWriter(args.output / f"{device_id}-{session_id}.ndjson.gz")
+
+    def record(ts: int, kind: str, payload: Dict[str, object]) -> Dict[str, object]:
+        return {
+            "ts": ts,
+            "type": kind,
+            "sessionId": session_id,
+            "deviceId": device_id,
+            "payload": payload,
+        }
+
+    meta = build_meta_payload(rng, session_id, device_id, start_ms, args.boat_length)
+    writer.write(record(start_ms, "meta", meta), "meta")
+    last_ts = start_ms
+    for last_ts, kind, payload in simulate_boat(
+        rng,
+        wind,
+        wind_rng,
+        start_ms,
+        args.hours * 3600.0,
+        args.lat,
+        args.lon,
+        args.leg_minutes * 60.0,
+        args.speed_knots,
+    ):
+        writer.write(record(last_ts, kind, payload), "data")
+    end_ms = last_ts + rng.randint(50, 500)
+    writer.write(record(end_ms, "final", {"endedAt": end_ms}), "final")
+    writer.close()
+    return f"{device_id}-{session_id}", writer.bytes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic recording sessions.")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Output directory")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--boats", type=int, default=1, help="Fleet size (one session per boat)")
+    parser.add_argument("--hours", type=float, default=2.0, help="Session length in hours")
+    parser.add_argument(
+        "--start-ms",
+        type=int,
+        default=DEFAULT_START_MS,
+        help="Session start as epoch milliseconds",
+    )
+    parser.add_argument("--lat", type=float, default=DEFAULT_LAT, help="Venue latitude")
+    parser.add_argument("--lon", type=float, default=DEFAULT_LON, help="Venue longitude")
+    parser.add_argument("--wind-dir", type=float, default=225.0, help="Mean wind direction (deg)")
+    parser.add_argument(
+        "--oscillation",
+        type=parse_oscillation,
+        action="append",
+        help="Wind oscillation PERIOD_MIN:AMPLITUDE_DEG (repeatable, default 9:6 and 23:4)",
+    )
+    parser.add_argument(
+        "--shift",
+        type=parse_shift,
+        action="append",
+        default=[],
+        help="Persistent wind shift AT_MIN:DELTA_DEG[:RAMP_MIN] (repeatable)",
+    )
+    parser.add_argument("--wind-noise", type=float, default=1.5, help="Wind noise sigma (deg)")
+    parser.add_argument("--leg-minutes", type=float, default=15.0, help="Upwind/downwind leg length")
+    parser.add_argument("--speed-knots", type=float, default=6.0, help="Nominal boat speed")
+    parser.add_argument("--boat-length", type=float, default=8, help="boatLengthMeters in meta")
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Write chunks/NNNNNN-*.ndjson.gz plus manifest.json per session",
+    )
+    parser.add_argument(
+        "--chunk-bytes",
+        type=int,
+        default=DEFAULT_CHUNK_BYTES,
+        help="Target uncompressed bytes per data chunk",
+    )
+    args = parser.parse_args()
+    if args.oscillation is None:
+        args.oscillation = [(9 * 60.0, 6.0), (23 * 60.0, 4.0)]
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    wind = WindModel(
+        random.Random(f"{args.seed}:wind"),
+        args.wind_dir,
+        args.oscillation,
+        args.shift,
+        args.wind_noise,
+    )
+    index = []
+    for boat_index in range(args.boats):
+        session_name, size = generate_session(args, boat_index, wind)
+        print(f"{session_name} {size / 1e6:.1f} MB uncompressed")
+        if not args.chunked:
+            index.append(
+                {"id": session_name, "label": session_name, "path": f"{session_name}.ndjson.gz"}
+            )
+    if index:
+        # Same shape as replay/manifest.json so the output can be served as replays.
+        with (args.output / "manifest.json").open("w") as handle:
+            json.dump(index, handle, indent=2)
+            handle.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
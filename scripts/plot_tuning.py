@@ -3,15 +3,33 @@
 
 Plots are saved to docs/plots and reference the variable names from tuning.js
 so we can keep the documentation in sync with the actual configuration.
+
+Each plot is registered with the KALMAN_TUNING entries it reads. A plot is only
+re-rendered when the hash of those inputs or of its plotting code changes, and
+stale plots are rendered in parallel worker processes.
 """
 
+import argparse
+import hashlib
+import inspect
+import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-import matplotlib.pyplot as plt
-import numpy as np
+import matplotlib
+
+# Plots are only ever written to disk; Agg also keeps worker processes headless.
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
 
-# Output location for generated SVGs (kept in repo for docs).
+# Output location for generated PDFs (kept in repo for docs).
 OUTPUT_DIR = Path(__file__).resolve().parents[1] / "docs" / "plots"
+# Input/code hash per plot from the last render, committed next to the PDFs.
+HASH_FILE = OUTPUT_DIR / "hashes.json"
+# Drop timestamps and version strings so unchanged plots stay byte-identical.
+PDF_METADATA = {"Creator": None, "Producer": None, "CreationDate": None}
 
 # Keep a local copy of the tuning values so plots stay deterministic and
 # can be regenerated without importing app code.
@@ -53,9 +71,65 @@ def annotate_line(ax, label, xy, xytext, ha="left", va="center"):
 
 def save_plot(fig, name):
     # Save PDF for LaTeX builds (SVGs removed now that docs are LaTeX-only).
-    fig.savefig(OUTPUT_DIR / f"{name}.pdf", format="pdf")
+    fig.savefig(OUTPUT_DIR / f"{name}.pdf", format="pdf", metadata=PDF_METADATA)
+
+
+# name -> (plot function, KALMAN_TUNING key paths it reads)
+PLOTS = {}
+
+
+def register_plot(name, inputs):
+    # Declared inputs must cover every KALMAN_TUNING value the plot reads,
+    # otherwise edits to the missing ones will not trigger a rebuild.
+    def decorator(func):
+        PLOTS[name] = (func, [tuple(path.split(".")) for path in inputs])
+        return func
+
+    return decorator
+
 
+def tuning_value(path):
+    value = KALMAN_TUNING
+    for key in path:
+        value = value[key]
+    return value
 
+
+def plot_hash(name):
+    # Shared helpers are part of every plot's code, as is the matplotlib version.
+    func, inputs = PLOTS[name]
+    payload = {
+        "inputs": {".".join(path): tuning_value(path) for path in inputs},
+        "code": [inspect.getsource(item) for item in (func, annotate_line, save_plot)],
+        "metadata": PDF_METADATA,
+        "matplotlib": matplotlib.__version__,
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def load_hashes():
+    try:
+        with HASH_FILE.open() as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_plot(name):
+    # Runs in a worker process.
+    func, _inputs = PLOTS[name]
+    func()
+    return name
+
+
+@register_plot(
+    "gain-q-length",
+    [
+        "processNoise.baseAccelerationVariance",
+        "processNoise.baseBoatLengthMeters",
+    ],
+)
 def plot_q_length():
     # q scales with boat length (flat at anchor, then decays as 1/L^2).
     base_q = KALMAN_TUNING["processNoise"]["baseAccelerationVariance"]
@@ -98,6 +172,13 @@ def plot_q_length():
     plt.close(fig)
 
 
+@register_plot(
+    "gain-speed-scale",
+    [
+        "processNoise.speedScale.minKnots",
+        "processNoise.speedScale.anchorKnots",
+    ],
+)
 def plot_speed_scale():
     # speedScale depends on the recent max speed (clamped by minKnots, anchored at anchorKnots).
     speed_cfg = KALMAN_TUNING["processNoise"]["speedScale"]
@@ -151,6 +232,15 @@ def plot_speed_scale():
     plt.close(fig)
 
 
+@register_plot(
+    "gain-gravity-alpha",
+    [
+        "imu.gravityLowPass.baseAlpha",
+        "imu.gravityLowPass.baseBoatLengthMeters",
+        "imu.gravityLowPass.minAlpha",
+        "imu.gravityLowPass.maxAlpha",
+    ],
+)
 def plot_gravity_alpha():
     # Low-pass alpha scales with boat length and is clamped to min/max values.
     cfg = KALMAN_TUNING["imu"]["gravityLowPass"]
@@ -210,11 +300,34 @@ def plot_gravity_alpha():
 
 
 def main():
-    # Ensure output directory exists before writing SVGs.
+    parser = argparse.ArgumentParser(description="Regenerate tuning plots for docs.")
+    parser.add_argument("--force", action="store_true", help="Re-render every plot")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes")
+    args = parser.parse_args()
+
+    # Ensure output directory exists before writing PDFs.
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    plot_q_length()
-    plot_speed_scale()
-    plot_gravity_alpha()
+    previous = load_hashes()
+    current = {name: plot_hash(name) for name in PLOTS}
+    stale = [
+        name
+        for name in PLOTS
+        if args.force
+        or previous.get(name) != current[name]
+        or not (OUTPUT_DIR / f"{name}.pdf").exists()
+    ]
+    if not stale:
+        print("Plots up to date")
+        return
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for name in pool.map(render_plot, stale):
+            print(f"rendered {name}")
+
+    # Only record hashes once the PDFs they describe have been written.
+    with HASH_FILE.open("w") as handle:
+        json.dump({name: current[name] for name in sorted(current)}, handle, indent=2)
+        handle.write("\n")
 
 
 if __name__ == "__main__":
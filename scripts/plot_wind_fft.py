@@ -3,10 +3,16 @@
 
 import argparse
 import csv
+import hashlib
+import inspect
+import os
+import pickle
 import sys
+from collections import OrderedDict
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -25,6 +31,9 @@ PH_THRESHOLD_SCALE = 1.0 / 3.0
 WELCH_WINDOW_SEC = 10 * 60.0
 WELCH_STEP_SEC = 60.0
 WELCH_SEGMENT_SEC = 8 * 60.0
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[1] / ".cache" / "plot_wind_fft"
+MEMORY_CACHE_ENTRIES = 32
+DISK_CACHE_ENTRIES = 64
 
 
 def parse_timestamp(raw: Optional[str]) -> Optional[float]:
@@ -181,7 +190,13 @@ def compute_page_hinkley(
     return ph_pos, ph_neg, events
 
 
-def compute_ph_threshold(step_deg: float, drift: float, delay_sec: float, dt: float) -> float:
+def compute_ph_threshold(
+    step_deg: float,
+    drift: float,
+    delay_sec: float,
+    dt: float,
+    scale: float = PH_THRESHOLD_SCALE,
+) -> float:
     if not np.isfinite(step_deg) or not np.isfinite(drift) or not np.isfinite(delay_sec):
         return 0.0
     if not np.isfinite(dt) or dt <= 0:
@@ -189,7 +204,7 @@ def compute_ph_threshold(step_deg: float, drift: float, delay_sec: float, dt: fl
     effective_step = max(0.0, step_deg - drift)
     if effective_step <= 0.0:
         return 0.0
-    return effective_step * (delay_sec / dt) * PH_THRESHOLD_SCALE
+    return effective_step * (delay_sec / dt) * scale
 
 
 def fit_linear_trend(time_axis: np.ndarray, values: np.ndarray) -> np.ndarray:
@@ -473,6 +488,289 @@ def plot_page_hinkley(
     fig.tight_layout()
 
 
+def fingerprint_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Two-level LRU cache for stage outputs, keyed by stage key."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path],
+        memory_entries: int = MEMORY_CACHE_ENTRIES,
+        disk_entries: int = DISK_CACHE_ENTRIES,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.memory_entries = max(0, memory_entries)
+        self.disk_entries = max(0, disk_entries)
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return True, self._memory[key]
+        if self.cache_dir is None:
+            return False, None
+        path = self._disk_path(key)
+        try:
+            with path.open("rb") as handle:
+                value = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+        # Touch so disk eviction follows recency of use, not of creation.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, value)
+        return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        self._remember(key, value)
+        if self.cache_dir is None or self.disk_entries == 0:
+            return
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with tmp_path.open("wb") as handle:
+            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _remember(self, key: str, value: Any) -> None:
+        if self.memory_entries == 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        if len(entries) <= self.disk_entries:
+            return
+        entries.sort()
+        for _mtime, path in entries[: len(entries) - self.disk_entries]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        deps: Sequence[str],
+        params: Callable[[], Dict[str, Any]],
+        compute: Callable[..., Any],
+        helpers: Sequence[Callable[..., Any]] = (),
+    ) -> None:
+        self.name = name
+        self.deps = tuple(deps)
+        self.params = params
+        self.compute = compute
+        self.helpers = tuple(helpers)
+
+    def code(self) -> str:
+        # Source of the stage and the helpers it calls, so code edits invalidate
+        # cached outputs the same way parameter edits do.
+        compute = self.compute.func if isinstance(self.compute, partial) else self.compute
+        parts = []
+        for func in (compute, *self.helpers):
+            try:
+                parts.append(inspect.getsource(func))
+            except (OSError, TypeError):
+                # No source on disk (e.g. defined interactively); fall back to bytecode.
+                parts.append(repr((func.__code__.co_code, func.__code__.co_consts)))
+        return "\n".join(parts)
+
+
+class StageGraph:
+    """Lazily evaluated stage DAG.
+
+    A stage key hashes its name, its code, the parameters it reads and the keys
+    of its dependencies, so it changes exactly when something upstream changes. A
+    cached stage is returned without touching its dependencies at all.
+    """
+
+    def __init__(self, stages: Sequence[Stage], cache: StageCache) -> None:
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache = cache
+        self._keys: Dict[str, str] = {}
+        self.computed: List[str] = []
+
+    def key(self, name: str) -> str:
+        if name not in self._keys:
+            stage = self.stages[name]
+            digest = hashlib.sha256()
+            digest.update(name.encode())
+            digest.update(stage.code().encode())
+            digest.update(repr(sorted(stage.params().items())).encode())
+            for dep in stage.deps:
+                digest.update(self.key(dep).encode())
+            self._keys[name] = digest.hexdigest()
+        return self._keys[name]
+
+    def get(self, name: str) -> Any:
+        key = self.key(name)
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        stage = self.stages[name]
+        inputs = [self.get(dep) for dep in stage.deps]
+        value = stage.compute(*inputs, **stage.params())
+        self.computed.append(name)
+        self.cache.put(key, value)
+        return value
+
+
+def _stage_load(csv_path: Path, fingerprint: str) -> Tuple[np.ndarray, np.ndarray]:
+    return load_wind_samples(csv_path)
+
+
+def _stage_resample(
+    samples: Tuple[np.ndarray, np.ndarray],
+    unwrap: bool,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    times, angles = samples
+    values, dt = resample_uniform(times, angles, unwrap=unwrap)
+    time_axis = np.arange(len(values), dtype=float) * dt
+    return time_axis, values, dt
+
+
+def _stage_trend(resampled: Tuple[np.ndarray, np.ndarray, float]) -> np.ndarray:
+    time_axis, values, _dt = resampled
+    return fit_linear_trend(time_axis, values)
+
+
+def _stage_filter(
+    resampled: Tuple[np.ndarray, np.ndarray, float],
+    trend: np.ndarray,
+    tau_sec: float,
+) -> np.ndarray:
+    _time_axis, values, dt = resampled
+    return first_order_filtfilt(values - trend, dt, tau_sec)
+
+
+def _stage_fft(
+    resampled: Tuple[np.ndarray, np.ndarray, float],
+    filtered: np.ndarray,
+) -> Tuple[float, np.ndarray, np.ndarray, np.ndarray]:
+    _time_axis, _values, dt = resampled
+    mean_offset = float(np.mean(filtered))
+    freq, spectrum, amplitude = compute_fft(filtered - mean_offset, dt)
+    return mean_offset, freq, spectrum, amplitude
+
+
+def _stage_peaks(
+    fft: Tuple[float, np.ndarray, np.ndarray, np.ndarray],
+    min_period_sec: float,
+    max_freq_hz: float,
+    count: int,
+) -> List[Tuple[float, float, float, float]]:
+    _mean_offset, freq, spectrum, amplitude = fft
+    return select_top_peaks(freq, spectrum, amplitude, min_period_sec, max_freq_hz, count)
+
+
+def _stage_ph_filter(
+    resampled: Tuple[np.ndarray, np.ndarray, float],
+    tau_sec: float,
+) -> np.ndarray:
+    _time_axis, values, dt = resampled
+    return first_order_filtfilt(values, dt, tau_sec)
+
+
+def _stage_ph(
+    resampled: Tuple[np.ndarray, np.ndarray, float],
+    ph_filtered: np.ndarray,
+    step_deg: float,
+    drift: float,
+    delay_sec: float,
+    threshold_scale: float,
+) -> Tuple[float, np.ndarray, np.ndarray, List[Tuple[int, str]]]:
+    _time_axis, _values, dt = resampled
+    threshold = compute_ph_threshold(step_deg, drift, delay_sec, dt, threshold_scale)
+    ph_pos, ph_neg, events = compute_page_hinkley(ph_filtered, drift, threshold)
+    return threshold, ph_pos, ph_neg, events
+
+
+def build_stage_graph(csv_path: Path, unwrap: bool, cache: StageCache) -> StageGraph:
+    # Each params callable lists only the constants its stage reads, so editing
+    # one constant invalidates that stage and everything downstream of it.
+    fingerprint = fingerprint_file(csv_path)
+    stages = [
+        Stage(
+            "load",
+            [],
+            lambda: {"fingerprint": fingerprint},
+            partial(_stage_load, csv_path),
+            [load_wind_samples, parse_timestamp],
+        ),
+        Stage(
+            "resample",
+            ["load"],
+            lambda: {"unwrap": unwrap},
+            _stage_resample,
+            [resample_uniform],
+        ),
+        Stage("trend", ["resample"], lambda: {}, _stage_trend, [fit_linear_trend]),
+        Stage(
+            "filter",
+            ["resample", "trend"],
+            lambda: {"tau_sec": FILTER_TAU_SEC},
+            _stage_filter,
+            [first_order_filtfilt],
+        ),
+        Stage("fft", ["resample", "filter"], lambda: {}, _stage_fft, [compute_fft]),
+        Stage(
+            "peaks",
+            ["fft"],
+            lambda: {
+                "min_period_sec": MIN_PERIOD_SEC,
+                "max_freq_hz": MAX_RECON_FREQ_HZ,
+                "count": RECON_PEAK_COUNT,
+            },
+            _stage_peaks,
+            [select_top_peaks],
+        ),
+        Stage(
+            "ph_filter",
+            ["resample"],
+            lambda: {"tau_sec": PH_FILTER_TAU_SEC},
+            _stage_ph_filter,
+            [first_order_filtfilt],
+        ),
+        Stage(
+            "ph",
+            ["resample", "ph_filter"],
+            lambda: {
+                "step_deg": PH_STEP_DEG,
+                "drift": PH_DRIFT_DEG,
+                "delay_sec": PH_TARGET_DELAY_SEC,
+                "threshold_scale": PH_THRESHOLD_SCALE,
+            },
+            _stage_ph,
+            [compute_ph_threshold, compute_page_hinkley],
+        ),
+    ]
+    return StageGraph(stages, cache)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Plot FFT of wind direction samples.")
     parser.add_argument("--csv", type=Path, default=DEFAULT_CSV, help="Path to CSV file")
@@ -481,29 +779,30 @@ def main() -> int:
         action="store_true",
         help="Do not unwrap angle discontinuities",
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached stage outputs",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Recompute every stage without reading or writing the disk cache",
+    )
     args = parser.parse_args()
 
-    times, angles = load_wind_samples(args.csv)
-    values, dt = resample_uniform(times, angles, unwrap=not args.no_unwrap)
-    time_axis = np.arange(len(values), dtype=float) * dt
-    ph_filtered = first_order_filtfilt(values, dt, PH_FILTER_TAU_SEC)
-    ph_threshold = compute_ph_threshold(PH_STEP_DEG, PH_DRIFT_DEG, PH_TARGET_DELAY_SEC, dt)
-    ph_pos, ph_neg, ph_events = compute_page_hinkley(ph_filtered, PH_DRIFT_DEG, ph_threshold)
-    trend = fit_linear_trend(time_axis, values)
-    detrended = values - trend
-    filtered = first_order_filtfilt(detrended, dt, FILTER_TAU_SEC)
+    cache = StageCache(None if args.no_cache else args.cache_dir)
+    graph = build_stage_graph(args.csv, unwrap=not args.no_unwrap, cache=cache)
+    time_axis, _values, _dt = graph.get("resample")
+    trend = graph.get("trend")
+    filtered = graph.get("filter")
+    mean_offset, _freq, _spectrum, _amplitude = graph.get("fft")
+    peaks = graph.get("peaks")
+    ph_threshold, ph_pos, ph_neg, ph_events = graph.get("ph")
+    if graph.computed:
+        print(f"Recomputed stages: {', '.join(graph.computed)}", file=sys.stderr)
     lpf_signal = filtered + trend
-    mean_offset = np.mean(filtered)
-    centered = filtered - mean_offset
-    freq, spectrum, amplitude = compute_fft(centered, dt)
-    peaks = select_top_peaks(
-        freq,
-        spectrum,
-        amplitude,
-        MIN_PERIOD_SEC,
-        MAX_RECON_FREQ_HZ,
-        RECON_PEAK_COUNT,
-    )
     reconstruction = trend + mean_offset
     for peak_freq, peak_amp, peak_phase, _period in peaks:
         reconstruction += peak_amp * np.cos(2 * np.pi * peak_freq * time_axis + peak_phase)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Build per-venue wind climatology from individual session CSVs.
+
+Each session is reduced to a Welch PSD, its top FFT peak periods and its
+Page-Hinkley shift events, then folded into one accumulator per venue and
+wind sector on disk. Accumulators only hold sums, counts, histograms and the
+ids of the sessions folded in, each sector in one atomically replaced file, so
+adding a session touches a single file and shards built in parallel merge
+exactly (PSD sums are stored as fixed-point integers for that reason).
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from plot_wind_fft import (
+    MAX_RECON_FREQ_HZ,
+    MIN_PERIOD_SEC,
+    StageCache,
+    build_stage_graph,
+    compute_welch_psd,
+)
+
+
+DEFAULT_STORE = Path(__file__).resolve().parents[1] / "climatology"
+STORE_VERSION = 1
+SECTOR_NAMES = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"]
+SECTOR_WIDTH_DEG = 360.0 / len(SECTOR_NAMES)
+CLIMATE_SEGMENT_SEC = 30 * 60.0
+# PSD grid: multiples of 1/segment up to the reconstruction cutoff.
+FREQ_GRID_HZ = np.arange(
+    0.0,
+    MAX_RECON_FREQ_HZ + 0.5 / CLIMATE_SEGMENT_SEC,
+    1.0 / CLIMATE_SEGMENT_SEC,
+)
+# Fixed-point quantum for summed PSDs (deg^2/Hz); integer sums merge exactly.
+PSD_QUANTUM = 1e-6
+PERIOD_EDGES_MIN = np.arange(1.0, 61.0, 1.0)
+SHIFT_EDGES_DEG = np.arange(-40.0, 42.0, 2.0)
+INTERVAL_EDGES_MIN = np.arange(0.0, 62.0, 2.0)
+COUNT_FIELDS = ("sessions", "duration_ms", "events_veer", "events_back", "psd_count")
+HIST_FIELDS = {
+    "peak_hist": PERIOD_EDGES_MIN,
+    "shift_hist": SHIFT_EDGES_DEG,
+    "interval_hist": INTERVAL_EDGES_MIN,
+}
+
+
+def sector_for_direction(direction_deg: float) -> str:
+    idx = int(np.floor(((direction_deg % 360.0) + SECTOR_WIDTH_DEG / 2) / SECTOR_WIDTH_DEG))
+    return SECTOR_NAMES[idx % len(SECTOR_NAMES)]
+
+
+def circular_mean_deg(angles: np.ndarray) -> float:
+    rad = np.deg2rad(angles)
+    return float(np.rad2deg(np.arctan2(np.mean(np.sin(rad)), np.mean(np.cos(rad)))) % 360.0)
+
+
+def empty_accumulator() -> Dict[str, object]:
+    acc: Dict[str, object] = {field: 0 for field in COUNT_FIELDS}
+    acc["psd_sum"] = np.zeros(FREQ_GRID_HZ.size, dtype=np.int64)
+    for field, edges in HIST_FIELDS.items():
+        acc[field] = np.zeros(edges.size + 1, dtype=np.int64)
+    acc["session_ids"] = set()
+    return acc
+
+
+def histogram(values: List[float], edges: np.ndarray) -> np.ndarray:
+    # Layout is [underflow, bins..., overflow]; out-of-range values are counted
+    # but kept apart so they never look like in-range data.
+    counts = np.zeros(edges.size + 1, dtype=np.int64)
+    if not values:
+        return counts
+    # digitize puts values < edges[0] at 0 and values >= edges[-1] at edges.size.
+    np.add.at(counts, np.digitize(np.asarray(values, dtype=float), edges), 1)
+    return counts
+
+
+def in_range(counts: np.ndarray) -> np.ndarray:
+    return counts[1:-1]
+
+
+def summarize_session(
+    csv_path: Path,
+    unwrap: bool = True,
+    cache: Optional[StageCache] = None,
+) -> Tuple[str, Dict[str, object]]:
+    """Reduce one session to its sector and a single-session accumulator."""
+    graph = build_stage_graph(csv_path, unwrap=unwrap, cache=cache or StageCache(None))
+    _times, angles = graph.get("load")
+    time_axis, _values, dt = graph.get("resample")
+    filtered = graph.get("filter")
+    peaks = graph.get("peaks")
+    _threshold, _ph_pos, _ph_neg, events = graph.get("ph")
+    ph_filtered = graph.get("ph_filter")
+
+    # The load stage is keyed by the CSV content hash, which doubles as the session id.
+    session_id = graph.stages["load"].params()["fingerprint"]
+    acc = empty_accumulator()
+    acc["session_ids"] = {session_id}
+    acc["sessions"] = 1
+    acc["duration_ms"] = int(round((time_axis[-1] - time_axis[0] + dt) * 1000.0))
+
+    nperseg = int(round(CLIMATE_SEGMENT_SEC / dt))
+    welch = compute_welch_psd(filtered - np.mean(filtered), dt, nperseg, nperseg // 2)
+    if welch is not None and nperseg <= filtered.size:
+        freq, psd = welch
+        # compute_welch_psd returns |X|^2/sum(w^2), which grows with nperseg;
+        # scaling by dt gives a density (deg^2/Hz) independent of logging rate.
+        density = psd * dt
+        on_grid = np.interp(FREQ_GRID_HZ, freq, density, left=0.0, right=0.0)
+        acc["psd_sum"] = np.round(on_grid / PSD_QUANTUM).astype(np.int64)
+        acc["psd_count"] = 1
+
+    acc["peak_hist"] = histogram(
+        [period / 60.0 for _freq, _amp, _phase, period in peaks if period >= MIN_PERIOD_SEC],
+        PERIOD_EDGES_MIN,
+    )
+
+    # A shift is the change in mean filtered direction across an event.
+    bounds = [0] + [idx for idx, _direction in events] + [ph_filtered.size]
+    means = [
+        float(np.mean(ph_filtered[start:end]))
+        for start, end in zip(bounds[:-1], bounds[1:])
+        if end > start
+    ]
+    acc["shift_hist"] = histogram(list(np.diff(means)), SHIFT_EDGES_DEG)
+    event_times = [time_axis[idx] for idx, _direction in events]
+    acc["interval_hist"] = histogram(
+        [delta / 60.0 for delta in np.diff(event_times)],
+        INTERVAL_EDGES_MIN,
+    )
+    acc["events_veer"] = sum(1 for _idx, direction in events if direction == "veer")
+    acc["events_back"] = sum(1 for _idx, direction in events if direction == "back")
+    return sector_for_direction(circular_mean_deg(angles)), acc
+
+
+def merge_accumulators(target: Dict[str, object], other: Dict[str, object]) -> Dict[str, object]:
+    overlap = target["session_ids"] & other["session_ids"]
+    if overlap:
+        raise ValueError(f"{len(overlap)} session(s) already present in accumulator")
+    for field in COUNT_FIELDS:
+        target[field] = int(target[field]) + int(other[field])
+    for field in ("psd_sum", *HIST_FIELDS):
+        target[field] = target[field] + other[field]
+    target["session_ids"] = target["session_ids"] | other["session_ids"]
+    return target
+
+
+def accumulator_path(store: Path, venue: str, sector: str) -> Path:
+    return store / venue / f"{sector}.npz"
+
+
+def load_accumulator(path: Path) -> Dict[str, object]:
+    if not path.exists():
+        return empty_accumulator()
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["version"]) != STORE_VERSION:
+            raise ValueError(f"{path}: unsupported store version {int(data['version'])}")
+        if not np.array_equal(data["freq_hz"], FREQ_GRID_HZ):
+            raise ValueError(f"{path}: PSD frequency grid does not match")
+        acc: Dict[str, object] = {field: int(data[field]) for field in COUNT_FIELDS}
+        acc["psd_sum"] = data["psd_sum"].astype(np.int64)
+        for field in HIST_FIELDS:
+            acc[field] = data[field].astype(np.int64)
+        acc["session_ids"] = set(data["session_ids"].tolist())
+    return acc
+
+
+def stage_accumulator(path: Path, acc: Dict[str, object]) -> Path:
+    # Counts and session ids share one file so a single rename commits both.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.tmp{os.getpid()}.npz")
+    try:
+        np.savez(
+            tmp_path,
+            version=STORE_VERSION,
+            freq_hz=FREQ_GRID_HZ,
+            session_ids=np.array(sorted(acc["session_ids"]), dtype=str),
+            **{field: acc[field] for field in COUNT_FIELDS},
+            psd_sum=acc["psd_sum"],
+            **{field: acc[field] for field in HIST_FIELDS},
+        )
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path
+
+
+def save_accumulator(path: Path, acc: Dict[str, object]) -> None:
+    os.replace(stage_accumulator(path, acc), path)
+
+
+def add_session(store: Path, venue: str, csv_path: Path, cache: Optional[StageCache] = None) -> str:
+    sector, session = summarize_session(csv_path, cache=cache)
+    path = accumulator_path(store, venue, sector)
+    acc = load_accumulator(path)
+    save_accumulator(path, merge_accumulators(acc, session))
+    return sector
+
+
+def merge_stores(target: Path, shards: List[Path]) -> None:
+    # Everything is loaded and checked in memory and every output is staged to
+    # a temp file before any is renamed into place, so a conflict, a bad shard
+    # or a failed write leaves the target untouched.
+    merged: Dict[Tuple[str, str], Dict[str, object]] = {}
+    for shard in shards:
+        for path in sorted(shard.glob("*/*.npz")):
+            if path.name.startswith("."):
+                continue
+            venue, sector = path.parent.name, path.stem
+            if (venue, sector) not in merged:
+                merged[(venue, sector)] = load_accumulator(accumulator_path(target, venue, sector))
+            acc = merged[(venue, sector)]
+            other = load_accumulator(path)
+            if other["session_ids"] and other["session_ids"] <= acc["session_ids"]:
+                # Already merged, e.g. by an earlier run that died while renaming.
+                continue
+            try:
+                merge_accumulators(acc, other)
+            except ValueError as exc:
+                raise ValueError(f"{shard}: {venue}/{sector}: {exc}") from None
+    staged: List[Tuple[Path, Path]] = []
+    try:
+        for (venue, sector), acc in merged.items():
+            dest = accumulator_path(target, venue, sector)
+            staged.append((stage_accumulator(dest, acc), dest))
+    except BaseException:
+        for tmp_path, _dest in staged:
+            tmp_path.unlink(missing_ok=True)
+        raise
+    for tmp_path, dest in staged:
+        os.replace(tmp_path, dest)
+
+
+def describe_accumulator(sector: str, acc: Dict[str, object]) -> str:
+    hours = int(acc["duration_ms"]) / 3_600_000.0
+    events = int(acc["events_veer"]) + int(acc["events_back"])
+    lines = [f"{sector}: sessions={acc['sessions']} hours={hours:.1f} events={events}"]
+    if int(acc["psd_count"]) > 0:
+        mean_psd = acc["psd_sum"] * PSD_QUANTUM / int(acc["psd_count"])
+        with np.errstate(divide="ignore"):
+            period_min = 1.0 / FREQ_GRID_HZ / 60.0
+        mask = (FREQ_GRID_HZ > 0) & (period_min * 60.0 >= MIN_PERIOD_SEC)
+        ranked = np.where(mask)[0][np.argsort(mean_psd[mask])[::-1][:3]]
+        lines.append("  psd peaks: " + ", ".join(f"{period_min[idx]:.1f}m" for idx in ranked))
+    peak_hist = in_range(acc["peak_hist"])
+    if peak_hist.sum():
+        idx = int(np.argmax(peak_hist))
+        lines.append(
+            f"  typical fft peak: {PERIOD_EDGES_MIN[idx]:.0f}-{PERIOD_EDGES_MIN[idx + 1]:.0f}m"
+            f" (outside {PERIOD_EDGES_MIN[0]:.0f}-{PERIOD_EDGES_MIN[-1]:.0f}m:"
+            f" {int(acc['peak_hist'][0] + acc['peak_hist'][-1])})"
+        )
+    if hours > 0:
+        lines.append(
+            f"  shifts/hour={events / hours:.1f} "
+            f"(veer={acc['events_veer']} back={acc['events_back']})"
+        )
+    shift_hist = in_range(acc["shift_hist"])
+    if shift_hist.sum():
+        centers = (SHIFT_EDGES_DEG[:-1] + SHIFT_EDGES_DEG[1:]) / 2.0
+        mean_abs = float(np.sum(np.abs(centers) * shift_hist) / shift_hist.sum())
+        lines.append(
+            f"  mean |shift|={mean_abs:.1f}°"
+            f" (beyond ±{SHIFT_EDGES_DEG[-1]:.0f}°:"
+            f" {int(acc['shift_hist'][0] + acc['shift_hist'][-1])})"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-venue wind climatology store.")
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE, help="Store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = sub.add_parser("add", help="Fold session CSVs into the store")
+    add_parser.add_argument("--venue", required=True, help="Venue name")
+    add_parser.add_argument("csv", type=Path, nargs="+", help="Session CSV files")
+    # Batch adds are one-shot per session, so by default they keep stage outputs
+    # in memory only instead of evicting plot_wind_fft's interactive disk cache.
+    add_parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Directory for cached stage outputs (default: no disk cache)",
+    )
+
+    merge_parser = sub.add_parser("merge", help="Merge shard stores into --store")
+    merge_parser.add_argument("shards", type=Path, nargs="+", help="Shard store directories")
+
+    show_parser = sub.add_parser("show", help="Summarize a venue")
+    show_parser.add_argument("--venue", required=True, help="Venue name")
+
+    args = parser.parse_args()
+
+    if args.command == "add":
+        cache = StageCache(args.cache_dir)
+        for csv_path in args.csv:
+            try:
+                sector = add_session(args.store, args.venue, csv_path, cache=cache)
+            except ValueError as exc:
+                print(f"skip {csv_path}: {exc}", file=sys.stderr)
+                continue
+            print(f"added {csv_path} -> {args.venue}/{sector}")
+    elif args.command == "merge":
+        try:
+            merge_stores(args.store, args.shards)
+        except ValueError as exc:
+            print(f"merge failed: {exc}", file=sys.stderr)
+            return 1
+    else:
+        venue_dir = args.store / args.venue
+        paths = sorted(venue_dir.glob("[!.]*.npz"))
+        if not paths:
+            print(f"No data for venue {args.venue}", file=sys.stderr)
+            return 1
+        for sector in SECTOR_NAMES:
+            path = accumulator_path(args.store, args.venue, sector)
+            if path in paths:
+                print(describe_accumulator(sector, load_accumulator(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())